@@ -1,11 +1,10 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from tensorflow import keras
-import pickle
-import matplotlib.pyplot as plt
+from kernels import BASE_PREMIUM, MULT, classify, scale
 import os
+import logging
+import threading
 
 # IMPORTANT : set_page_config DOIT être la PREMIÈRE commande Streamlit
 st.set_page_config(
@@ -17,24 +16,135 @@ st.set_page_config(
 # Forcer le mode texte brut pour éviter regex bugs
 os.environ['STREAMLIT_MARKDOWN_AUTOLINK'] = 'false'
 
+# Attributs des catégories de risque, indexés par l'indice renvoyé par classify (kernels.py)
+CATS = ('Faible', 'Moyen', 'Élevé')
+CLS = ('risk-low', 'risk-medium', 'risk-high')
+COLORS = ('green', 'orange', 'red')
+EMOJI = ('✅', '⚠️', '🚨')
+INTERPRETATIONS = (
+    """
+    **Profil à Faible Risque** ✅
+    - Score de risque négatif
+    - Espérance de vie supérieure à la moyenne
+    - Recommandation : Prime standard ou réduite
+    """,
+    """
+    **Profil à Risque Moyen** ⚠️
+    - Score de risque modéré
+    - Espérance de vie dans la moyenne
+    - Recommandation : Prime standard
+    """,
+    """
+    **Profil à Risque Élevé** 🚨
+    - Score de risque élevé
+    - Facteurs de risque identifiés
+    - Recommandation : Prime majorée ou examen médical
+    """,
+)
+
+ABOUT_TEMPLATE = """
+    ### Méthodologie
+    
+    **DeepSurv - Deep Learning for Survival Analysis**
+    - Architecture : Neural Network multi-couches
+    - Loss Function : Cox Proportional Hazards
+    - Optimisation : Adam optimizer
+    
+    **Métriques de Performance**
+    - **C-index (Concordance Index)** : Mesure la capacité du modèle à classer correctement les paires d'observations
+    - C-index > 0.7 : Excellent
+    - C-index 0.5-0.7 : Bon
+    - C-index < 0.5 : Faible
+    
+    **Applications**
+    - Tarification d'assurance-vie
+    - Évaluation de risque médical
+    - Prédiction de survie
+    - Segmentation de clientèle
+    
+    **Performance actuelle**
+    - C-index Test : {test_c_index:.3f}
+    - Dataset : {dataset_size} observations
+    - Features : {n_features}
+    """
+
+# Bandes colorées de l'échelle de risque, rendues côté navigateur par Vega-Lite
+RISK_BANDS_LAYER = {
+    "data": {"values": [
+        {"niveau": CATS[i], "debut": start, "fin": end, "couleur": COLORS[i]}
+        for i, (start, end) in enumerate([(-2, -0.5), (-0.5, 0.5), (0.5, 2)])
+    ]},
+    "mark": {"type": "bar", "opacity": 0.3},
+    "encoding": {
+        "y": {"field": "niveau", "type": "nominal", "sort": list(CATS), "title": None},
+        "x": {"field": "debut", "type": "quantitative", "title": "Score de Risque"},
+        "x2": {"field": "fin"},
+        "color": {"field": "couleur", "type": "nominal", "scale": None},
+    },
+}
+ZERO_RULE_LAYER = {
+    "data": {"values": [{"x": 0}]},
+    "mark": {"type": "rule", "color": "gray", "strokeWidth": 1, "opacity": 0.5},
+    "encoding": {"x": {"field": "x", "type": "quantitative"}},
+}
+
 @st.cache_resource
 def load_models():
-    model = keras.models.load_model('deepsurv_model.h5', compile=False)
-    with open('scaler.pkl', 'rb') as f:
-        scaler = pickle.load(f)
-    with open('metadata.pkl', 'rb') as f:
-        metadata = pickle.load(f)
-    with open('metrics.pkl', 'rb') as f:
-        metrics = pickle.load(f)
-    return model, scaler, metadata, metrics
+    # Masquer les logs info/warning de TF (les erreurs restent affichées)
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+    # Import différé : seule la première exécution (mise en cache) paie le coût de TensorFlow
+    import tensorflow as tf
 
-try:
-    model, scaler, metadata, metrics = load_models()
-    models_loaded = True
-except:
-    models_loaded = False
+    # Scaler, métadonnées et métriques exportés par export_assets.py (pas de sklearn au démarrage)
+    with np.load('assets.npz', allow_pickle=False) as d:
+        mean = d['mean'].astype(np.float32)
+        inv_scale = (1.0 / d['scale']).astype(np.float32)
+        metadata = {'feature_cols': d['feature_cols'].tolist()}
+        metrics = {
+            'test_c_index': float(d['test_c_index']),
+            'train_c_index': float(d['train_c_index']),
+            'n_features': int(d['n_features']),
+            'dataset_size': int(d['dataset_size']),
+        }
+
+    # Textes des métriques formatés une fois plutôt qu'à chaque rerun
+    metrics_fmt = {
+        'test': f"{metrics['test_c_index']:.3f}",
+        'train': f"{metrics['train_c_index']:.3f}",
+        'features': f"**Features**: {metrics['n_features']}",
+        'dataset': f"**Dataset**: {metrics['dataset_size']} observations",
+        'about': ABOUT_TEMPLATE.format(**metrics),
+    }
+
+    interp = tf.lite.Interpreter(model_path='deepsurv_model.tflite', num_threads=1)
+    interp.allocate_tensors()
+    input_index = interp.get_input_details()[0]['index']
+    output_index = interp.get_output_details()[0]['index']
+
+    # L'interpréteur est partagé par toutes les sessions (threads) : un appel à la fois
+    lock = threading.Lock()
+
+    def infer(x):
+        with lock:
+            interp.set_tensor(input_index, x)
+            interp.invoke()
+            return interp.get_tensor(output_index)
+
+    # Premier appel au démarrage pour ne pas payer l'initialisation au premier clic
+    n = len(metadata['feature_cols'])
+    infer(np.zeros((1, n), dtype=np.float32))
 
-st.markdown("""
+    # La clé d'un profil (valeurs arrondies dans l'ordre exact de feature_cols) est construite
+    # par une fonction générée, sans boucle ni recherche d'index
+    src = "def make_key(inputs):\n    return (\n" + "\n".join(
+        f"        round(inputs[{f!r}], 2)," for f in metadata['feature_cols']
+    ) + "\n    )"
+    ns = {}
+    exec(src, ns)
+    make_key = ns['make_key']
+    return infer, mean, inv_scale, make_key, metadata, metrics_fmt
+
+CSS = """
 <style>
     .stButton>button {
         background: linear-gradient(135deg, #1A367E 0%, #4A8FE7 100%);
@@ -65,7 +175,84 @@ st.markdown("""
         border-left: 5px solid #dc3545;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_data(max_entries=256)
+def _infer_cached(key):
+    # Un profil déjà analysé (à l'arrondi près) ne repasse ni par le scaler ni par le modèle
+    row = np.asarray(key, dtype=np.float32).reshape(1, -1)
+    return float(infer(scale(row, mean, inv_scale))[0, 0])
+
+def render_result(last):
+    risk_score, k, estimated_premium = last['score'], last['k'], last['premium']
+    risk_category, risk_class, risk_emoji, premium_multiplier = CATS[k], CLS[k], EMOJI[k], MULT[k]
+    
+    st.markdown("---")
+    st.subheader("📈 Résultat de l'Analyse de Risque")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown(f'<div class="metric-card {risk_class}">', unsafe_allow_html=True)
+        st.metric("Catégorie de Risque", f"{risk_emoji} {risk_category}")
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("Score de Risque", f"{risk_score:.4f}")
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("Prime Estimée", f"${estimated_premium:.2f}/an")
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("### 📊 Interprétation")
+        
+        (st.success, st.warning, st.error)[k](INTERPRETATIONS[k])
+        
+        st.info(f"""
+        **Base de calcul:**
+        - Prime de base : ${BASE_PREMIUM}/an
+        - Multiplicateur : {premium_multiplier}x
+        - Prime finale : ${estimated_premium:.2f}/an
+        """)
+    
+    with col2:
+        st.markdown("### 📈 Visualisation du Risque")
+        
+        spec = {
+            "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+            "title": {
+                "text": "Position sur l'Échelle de Risque",
+                "subtitle": f"Votre score: {risk_score:.3f}",
+            },
+            "height": 300,
+            "layer": [
+                RISK_BANDS_LAYER,
+                ZERO_RULE_LAYER,
+                {
+                    "data": {"values": [{"x": risk_score}]},
+                    "mark": {"type": "rule", "color": "black", "strokeWidth": 3, "strokeDash": [6, 4]},
+                    "encoding": {"x": {"field": "x", "type": "quantitative"}},
+                },
+            ],
+        }
+        st.vega_lite_chart(spec, use_container_width=True)
+
+try:
+    infer, mean, inv_scale, make_key, metadata, metrics_fmt = load_models()
+    models_loaded = True
+except Exception:
+    logging.exception("Échec du chargement des modèles")
+    models_loaded = False
+
+st.markdown(CSS, unsafe_allow_html=True)
 
 st.title("🧬 Survival Analysis - DeepSurv")
 st.markdown("### Prédiction de Risque pour Tarification d'Assurance-Vie")
@@ -77,13 +264,13 @@ if not models_loaded:
     st.stop()
 
 st.sidebar.header("📊 Performance du Modèle")
-st.sidebar.metric("C-index (Test)", f"{metrics['test_c_index']:.3f}")
-st.sidebar.metric("C-index (Train)", f"{metrics['train_c_index']:.3f}")
+st.sidebar.metric("C-index (Test)", metrics_fmt['test'])
+st.sidebar.metric("C-index (Train)", metrics_fmt['train'])
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🧠 Architecture")
 st.sidebar.write("**Modèle**: DeepSurv Neural Network")
-st.sidebar.write(f"**Features**: {metrics['n_features']}")
-st.sidebar.write(f"**Dataset**: {metrics['dataset_size']} observations")
+st.sidebar.write(metrics_fmt['features'])
+st.sidebar.write(metrics_fmt['dataset'])
 st.sidebar.markdown("---")
 st.sidebar.info("**C-index > 0.7** = Excellent pouvoir prédictif")
 
@@ -124,178 +311,58 @@ feature_ranges = {
 }
 
 n_cols = 3
-cols = st.columns(n_cols)
 
-inputs = {}
-for idx, feature in enumerate(feature_cols):
-    with cols[idx % n_cols]:
+@st.cache_resource
+def _make_render_inputs(feature_cols, feature_labels, feature_descriptions, feature_ranges, n_cols):
+    # Génère une fonction de saisie déroulée pour ces features : libellés, bornes et type de
+    # widget sont résolus ici une seule fois au lieu de l'être à chaque rerun. Tout ce qui est
+    # lu est passé en argument pour qu'une modification invalide le cache
+    src = ["def render_inputs(cols):", "    inputs = {}"]
+    for idx, feature in enumerate(feature_cols):
         label = feature_labels.get(feature, feature.replace('_', ' ').title())
         description = feature_descriptions.get(feature, f"Valeur pour {feature}")
         min_val, max_val = feature_ranges.get(feature, (0, 100))
         
+        src.append(f"    with cols[{idx % n_cols}]:")
         if max_val == 1:
-            inputs[feature] = st.selectbox(
-                label,
-                options=[0, 1],
-                index=0,
-                key=feature,
-                help=description
+            src.append(
+                f"        inputs[{feature!r}] = st.selectbox({label!r}, options=[0, 1], index=0, "
+                f"key={feature!r}, help={description!r})"
             )
         else:
-            inputs[feature] = st.number_input(
-                label,
-                min_value=float(min_val),
-                max_value=float(max_val),
-                value=float(min_val + (max_val - min_val) // 2),
-                step=1.0 if feature in ['age', 'prio'] else 0.1,
-                key=feature,
-                help=description
+            step = 1.0 if feature in ['age', 'prio'] else 0.1
+            src.append(
+                f"        inputs[{feature!r}] = st.number_input({label!r}, "
+                f"min_value={float(min_val)!r}, max_value={float(max_val)!r}, "
+                f"value={float(min_val + (max_val - min_val) // 2)!r}, step={step!r}, "
+                f"key={feature!r}, help={description!r})"
             )
+    src.append("    return inputs")
+    ns = {'st': st}
+    exec("\n".join(src), ns)
+    return ns['render_inputs']
+
+render_inputs = _make_render_inputs(
+    tuple(feature_cols), feature_labels, feature_descriptions, feature_ranges, n_cols
+)
+inputs = render_inputs(st.columns(n_cols))
 
 if st.button("🧬 Analyser le Risque", use_container_width=True):
     with st.spinner("Analyse en cours..."):
-        features_list = [inputs.get(feat, 0) for feat in metadata['feature_cols']]
-        features_array = np.array(features_list).reshape(1, -1)
-        features_scaled = scaler.transform(features_array)
-        
-        risk_score = float(model.predict(features_scaled, verbose=0)[0][0])
+        risk_score = _infer_cached(make_key(inputs))
         
         risk_percentile = 50.0
         
-        if risk_score < -0.5:
-            risk_category = 'Faible'
-            risk_class = 'risk-low'
-            risk_color = 'green'
-            risk_emoji = '✅'
-        elif risk_score < 0.5:
-            risk_category = 'Moyen'
-            risk_class = 'risk-medium'
-            risk_color = 'orange'
-            risk_emoji = '⚠️'
-        else:
-            risk_category = 'Élevé'
-            risk_class = 'risk-high'
-            risk_color = 'red'
-            risk_emoji = '🚨'
-        
-        st.markdown("---")
-        st.subheader("📈 Résultat de l'Analyse de Risque")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown(f'<div class="metric-card {risk_class}">', unsafe_allow_html=True)
-            st.metric("Catégorie de Risque", f"{risk_emoji} {risk_category}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Score de Risque", f"{risk_score:.4f}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col3:
-            base_premium = 1000
-            if risk_category == 'Faible':
-                premium_multiplier = 0.8
-            elif risk_category == 'Moyen':
-                premium_multiplier = 1.0
-            else:
-                premium_multiplier = 1.5
-            
-            estimated_premium = base_premium * premium_multiplier
-            
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Prime Estimée", f"${estimated_premium:.2f}/an")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        st.markdown("---")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("### 📊 Interprétation")
-            
-            if risk_category == 'Faible':
-                st.success("""
-                **Profil à Faible Risque** ✅
-                - Score de risque négatif
-                - Espérance de vie supérieure à la moyenne
-                - Recommandation : Prime standard ou réduite
-                """)
-            elif risk_category == 'Moyen':
-                st.warning("""
-                **Profil à Risque Moyen** ⚠️
-                - Score de risque modéré
-                - Espérance de vie dans la moyenne
-                - Recommandation : Prime standard
-                """)
-            else:
-                st.error("""
-                **Profil à Risque Élevé** 🚨
-                - Score de risque élevé
-                - Facteurs de risque identifiés
-                - Recommandation : Prime majorée ou examen médical
-                """)
-            
-            st.info(f"""
-            **Base de calcul:**
-            - Prime de base : ${base_premium}/an
-            - Multiplicateur : {premium_multiplier}x
-            - Prime finale : ${estimated_premium:.2f}/an
-            """)
-        
-        with col2:
-            st.markdown("### 📈 Visualisation du Risque")
-            
-            fig, ax = plt.subplots(figsize=(8, 6))
-            
-            risk_levels = ['Faible', 'Moyen', 'Élevé']
-            risk_ranges = [-2, -0.5, 0.5, 2]
-            colors = ['green', 'orange', 'red']
-            
-            for i in range(len(risk_levels)):
-                ax.barh(risk_levels[i], risk_ranges[i+1] - risk_ranges[i], 
-                       left=risk_ranges[i], color=colors[i], alpha=0.3)
-            
-            ax.axvline(x=risk_score, color='black', linewidth=3, linestyle='--', 
-                      label=f'Votre score: {risk_score:.3f}')
-            ax.axvline(x=0, color='gray', linewidth=1, linestyle='-', alpha=0.5)
-            
-            ax.set_xlabel('Score de Risque', fontsize=12)
-            ax.set_title('Position sur l\'Échelle de Risque', fontsize=14, fontweight='bold')
-            ax.legend()
-            ax.grid(alpha=0.3, axis='x')
-            
-            st.pyplot(fig)
+        k, estimated_premium = classify(risk_score)
+        st.session_state.last = {'score': risk_score, 'k': k, 'premium': estimated_premium}
+
+if 'last' in st.session_state:
+    render_result(st.session_state.last)
 
 st.markdown("---")
 
 with st.expander("📚 À propos du modèle DeepSurv"):
-    st.write(f"""
-    ### Méthodologie
-    
-    **DeepSurv - Deep Learning for Survival Analysis**
-    - Architecture : Neural Network multi-couches
-    - Loss Function : Cox Proportional Hazards
-    - Optimisation : Adam optimizer
-    
-    **Métriques de Performance**
-    - **C-index (Concordance Index)** : Mesure la capacité du modèle à classer correctement les paires d'observations
-    - C-index > 0.7 : Excellent
-    - C-index 0.5-0.7 : Bon
-    - C-index < 0.5 : Faible
-    
-    **Applications**
-    - Tarification d'assurance-vie
-    - Évaluation de risque médical
-    - Prédiction de survie
-    - Segmentation de clientèle
-    
-    **Performance actuelle**
-    - C-index Test : {metrics['test_c_index']:.3f}
-    - Dataset : {metrics['dataset_size']} observations
-    - Features : {metrics['n_features']}
-    """)
+    st.write(metrics_fmt['about'])
 
 with st.expander("🔬 Exemples de Profils"):
     st.write("""
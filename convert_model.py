@@ -0,0 +1,15 @@
+import tensorflow as tf
+from tensorflow import keras
+
+# Conversion hors-ligne du modèle DeepSurv Keras (.h5) vers TFLite (poids float16)
+model = keras.models.load_model('deepsurv_model.h5', compile=False)
+
+converter = tf.lite.TFLiteConverter.from_keras_model(model)
+converter.optimizations = [tf.lite.Optimize.DEFAULT]
+converter.target_spec.supported_types = [tf.float16]
+tflite_model = converter.convert()
+
+with open('deepsurv_model.tflite', 'wb') as f:
+    f.write(tflite_model)
+
+print(f"deepsurv_model.tflite écrit ({len(tflite_model)} octets)")
@@ -0,0 +1,23 @@
+import pickle
+import numpy as np
+
+# Export hors-ligne du scaler, des métadonnées et des métriques vers un unique fichier .npz
+with open('scaler.pkl', 'rb') as f:
+    scaler = pickle.load(f)
+with open('metadata.pkl', 'rb') as f:
+    metadata = pickle.load(f)
+with open('metrics.pkl', 'rb') as f:
+    metrics = pickle.load(f)
+
+np.savez(
+    'assets.npz',
+    mean=scaler.mean_,
+    scale=scaler.scale_,
+    feature_cols=np.array(metadata['feature_cols']),
+    test_c_index=metrics['test_c_index'],
+    train_c_index=metrics['train_c_index'],
+    n_features=metrics['n_features'],
+    dataset_size=metrics['dataset_size'],
+)
+
+print("assets.npz écrit")
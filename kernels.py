@@ -0,0 +1,23 @@
+import numpy as np
+from numba import njit
+
+# Seuils de score entre catégories de risque et multiplicateurs de prime associés
+BASE_PREMIUM = 1000
+THRESH = np.array([-0.5, 0.5])
+MULT = np.array([0.8, 1.0, 1.5])
+
+# Noyaux Numba dans un module importé : Streamlit ré-exécute app.py à chaque interaction,
+# mais ce module reste dans sys.modules, donc compilé une seule fois par processus
+
+@njit(cache=True)
+def classify(s):
+    k = 0 if s < THRESH[0] else (1 if s < THRESH[1] else 2)
+    return k, BASE_PREMIUM * MULT[k]
+
+@njit(cache=True, fastmath=True)
+def scale(x, m, inv):
+    return (x - m) * inv
+
+# Compilation au chargement pour que le premier clic ne paie pas le JIT
+classify(0.0)
+scale(np.zeros((1, 1), dtype=np.float32), np.zeros(1, dtype=np.float32), np.ones(1, dtype=np.float32))